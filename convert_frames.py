@@ -0,0 +1,220 @@
+import argparse
+import h5py
+import numpy as np
+import os
+import re
+import scipy.io as sio
+
+from multiprocessing import Pool
+from PIL import Image
+from tqdm import tqdm
+
+
+FRAME_PATTERN = re.compile(r'^frame_(\d+)\.png$')
+CUBE_FORMATS = ('.h5', '.hdf5', '.mat', '.npy')
+# size of .mat (v5) variable is stored in uint32 together with header of variable
+MAT_MAX_BYTES = 2 ** 32 - 1024
+
+
+def natural_sort_key(string):
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', string)]
+
+
+class CubeWriter:
+    """
+    Writes hyperspectral cube line by line to HDF5, .mat or .npy file
+
+    HDF5 and .npy cubes are written directly to disk, so memory is bounded by one line.
+    scipy can write .mat files only from whole array, so .mat cube is collected in temporary
+    .npy memmap next to output file and converted on close, which reads whole cube into memory.
+    .mat v5 format can't store variables bigger than 4 GB, such cubes are refused before writing.
+
+    Cube layout is (lines, spatial, bands) as in OpenHSL.
+
+    Attributes
+    ----------
+    path_to_cube : str
+        path to output file, format is chosen by extension
+    shape : tuple
+        shape of cube
+    dtype : np.dtype
+        type of cube elements
+    key : str
+        name of dataset in HDF5 and .mat files
+    """
+    def __init__(self,
+                 path_to_cube: str,
+                 shape: tuple,
+                 dtype,
+                 key: str = 'image'):
+        self.path_to_cube = path_to_cube
+        self.extension = os.path.splitext(path_to_cube)[1].lower()
+        self.key = key
+        self._file = None
+        self._tmp_path = None
+
+        if self.extension in ('.h5', '.hdf5'):
+            self._file = h5py.File(path_to_cube, 'w')
+            self.cube = self._file.create_dataset(key, shape=shape, dtype=dtype,
+                                                  chunks=(1,) + tuple(shape[1:]))
+        elif self.extension == '.npy':
+            self.cube = np.lib.format.open_memmap(path_to_cube, mode='w+', dtype=dtype, shape=shape)
+        elif self.extension == '.mat':
+            cube_bytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            if cube_bytes > MAT_MAX_BYTES:
+                raise ValueError(f'Cube of {cube_bytes / 2 ** 30:.1f} GB is too big for .mat file, '
+                                 f'maximum is 4 GB, use .h5 or .npy')
+            self._tmp_path = os.path.splitext(path_to_cube)[0] + '_tmp.npy'
+            self.cube = np.lib.format.open_memmap(self._tmp_path, mode='w+', dtype=dtype, shape=shape)
+        else:
+            raise ValueError(f'Unsupported cube format {self.extension}, expected one of {CUBE_FORMATS}')
+
+    def __setitem__(self, line_index, line):
+        self.cube[line_index] = line
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        elif self._tmp_path is not None:
+            self.cube.flush()
+            sio.savemat(self.path_to_cube, {self.key: self.cube})
+            self.cube = None
+            os.remove(self._tmp_path)
+        else:
+            self.cube.flush()
+
+    def abort(self):
+        """
+        Closes and removes output and temporary files without finalizing cube
+        """
+        if self._file is not None:
+            self._file.close()
+        self.cube = None
+        for path in (self.path_to_cube, self._tmp_path):
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+
+
+def find_frames(path_to_frames: str) -> dict:
+    """
+    Returns paths of frame_N.png files of folder by frame index in natural order
+    """
+    frames = {}
+    for file_name in sorted(os.listdir(path_to_frames), key=natural_sort_key):
+        match = FRAME_PATTERN.match(file_name)
+        if match:
+            frames[int(match.group(1))] = os.path.join(path_to_frames, file_name)
+    return frames
+
+
+def get_missing_frames(frame_indexes) -> list:
+    """
+    Returns indexes absent between 0 and maximal frame index
+    """
+    frame_indexes = set(frame_indexes)
+    if not frame_indexes:
+        return []
+    return [i for i in range(max(frame_indexes) + 1) if i not in frame_indexes]
+
+
+def read_frame(path_to_frame: str) -> np.array:
+    with Image.open(path_to_frame) as img:
+        return np.asarray(img)
+
+
+def frame_to_line(frame: np.array, spectral_axis: int) -> np.array:
+    """
+    Converts frame to (spatial, bands) line of cube
+    """
+    return frame.T if spectral_axis == 0 else frame
+
+
+def convert_frames(path_to_frames: str,
+                   path_to_cube: str,
+                   key: str = 'image',
+                   workers: int = None,
+                   batch_size: int = 64,
+                   spectral_axis: int = 0,
+                   allow_missing: bool = False):
+    """
+    Converts folder of frame_N.png files to single hyperspectral cube
+
+    Frames are decoded in parallel processes by batches and written to cube as soon as
+    batch is decoded, so memory is bounded by batch_size frames.
+
+    Parameters
+    ----------
+    path_to_frames : str
+        folder with frame_N.png files
+    path_to_cube : str
+        path to .h5, .hdf5, .mat or .npy file
+    key : str
+        name of dataset in HDF5 and .mat files
+    workers : int
+        count of decoding processes, by default count of CPUs
+    batch_size : int
+        count of frames decoded at once
+    spectral_axis : int
+        axis of frame along which spectrum is dispersed
+    allow_missing : bool
+        fill missing frames with zeros instead of raising error
+    """
+    frames = find_frames(path_to_frames)
+    if not frames:
+        raise ValueError(f'No frame_N.png files in {path_to_frames}')
+
+    missing = get_missing_frames(frames.keys())
+    if missing and not allow_missing:
+        raise ValueError(f'{len(missing)} frames are missing in {path_to_frames}: {missing[:10]}')
+
+    first_line = frame_to_line(read_frame(next(iter(frames.values()))), spectral_axis)
+    if first_line.ndim != 2:
+        raise ValueError(f'Frames must be single channel images, got shape {first_line.shape}')
+
+    shape = (max(frames.keys()) + 1,) + first_line.shape
+    writer = CubeWriter(path_to_cube, shape=shape, dtype=first_line.dtype, key=key)
+
+    indexes = list(frames.keys())
+    try:
+        with Pool(workers) as pool, tqdm(total=len(indexes)) as progress:
+            for start in range(0, len(indexes), batch_size):
+                batch = indexes[start:start + batch_size]
+                for index, frame in zip(batch, pool.map(read_frame, [frames[i] for i in batch])):
+                    line = frame_to_line(frame, spectral_axis)
+                    if line.shape != first_line.shape:
+                        raise ValueError(f'Frame {frames[index]} has shape {frame.shape}, '
+                                         f'expected shape of first frame')
+                    writer[index] = line
+                progress.update(len(batch))
+        writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+
+    return missing
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Converts folder of frame_N.png files to hyperspectral cube')
+    parser.add_argument('path_to_frames', help='folder with frame_N.png files')
+    parser.add_argument('path_to_cube', help=f'output file, one of {", ".join(CUBE_FORMATS)}; '
+                                             f'.mat is limited to 4 GB and is assembled in memory')
+    parser.add_argument('-k', '--key', default='image', help='name of dataset in HDF5 and .mat files')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='count of decoding processes')
+    parser.add_argument('-b', '--batch-size', type=int, default=64, help='count of frames decoded at once')
+    parser.add_argument('--spectral-axis', type=int, choices=(0, 1), default=0,
+                        help='axis of frame along which spectrum is dispersed')
+    parser.add_argument('--allow-missing', action='store_true', help='fill missing frames with zeros')
+    args = parser.parse_args()
+
+    missing = convert_frames(path_to_frames=args.path_to_frames,
+                             path_to_cube=args.path_to_cube,
+                             key=args.key,
+                             workers=args.workers,
+                             batch_size=args.batch_size,
+                             spectral_axis=args.spectral_axis,
+                             allow_missing=args.allow_missing)
+
+    if missing:
+        print(f'{len(missing)} missing frames filled with zeros: {missing[:10]}')
+    print(f'Cube saved to {args.path_to_cube}')
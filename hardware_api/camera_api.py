@@ -1,8 +1,34 @@
 import numpy as np
+import re
 
 from pypylon import pylon
 
 
+def get_pixel_format_bytes(pixel_format: str) -> int:
+    """
+    Returns count of bytes per pixel of frame array which pylon returns for pixel format
+
+    Packed formats (Mono12p, BayerRG12Packed) are unpacked by pylon to 16 bits per channel,
+    colour formats (RGB8, BGR10) have 3 or 4 channels, YUV 4:2:2 formats take 2 bytes per pixel.
+
+    Parameters
+    ----------
+    pixel_format : str
+        GenICam name of pixel format, e.g. 'Mono12p'
+    """
+    if pixel_format.startswith(('YUV', 'YCbCr')):
+        return 2 if '422' in pixel_format else 3
+    match = re.search(r'(\d+)(p|Packed|packed)?$', pixel_format)
+    bits = int(match.group(1)) if match else 8
+    if pixel_format.startswith(('RGBa', 'RGBA', 'BGRa', 'BGRA')):
+        channels = 4
+    elif pixel_format.startswith(('RGB', 'BGR')):
+        channels = 3
+    else:
+        channels = 1
+    return channels * (1 if bits <= 8 else 2)
+
+
 class BaslerCam:
     """
     Class to work with Basler camera
@@ -34,6 +60,44 @@ class BaslerCam:
         self.camera.GainAuto.SetValue('Off')
         self.camera.Gain.SetValue(gain_value)
 
+    def set_roi(self, offset_x: int, offset_y: int, width: int, height: int):
+        """
+        sets region of interest of sensor
+
+        Parameters
+        ----------
+        offset_x : int
+            horizontal offset of ROI in pixels
+        offset_y : int
+            vertical offset of ROI in pixels
+        width : int
+            width of ROI in pixels
+        height : int
+            height of ROI in pixels
+        """
+        self.camera.Open()
+        # offsets are reset first, otherwise new width or height may not fit into sensor
+        self.camera.OffsetX.SetValue(0)
+        self.camera.OffsetY.SetValue(0)
+        self.camera.Width.SetValue(width)
+        self.camera.Height.SetValue(height)
+        self.camera.OffsetX.SetValue(offset_x)
+        self.camera.OffsetY.SetValue(offset_y)
+
+    def get_frame_shape(self) -> tuple:
+        """
+        Returns (height, width) of frame with current ROI
+        """
+        self.camera.Open()
+        return self.camera.Height.GetValue(), self.camera.Width.GetValue()
+
+    def get_bytes_per_pixel(self) -> int:
+        """
+        Returns count of bytes per pixel of frame array for current pixel format
+        """
+        self.camera.Open()
+        return get_pixel_format_bytes(self.camera.PixelFormat.GetValue())
+
     def make_shot(self) -> np.array:
         """
         Makes shot from camera and return it as array
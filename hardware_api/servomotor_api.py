@@ -11,6 +11,7 @@ class Servomotor:
     def __init__(self):
 
         self.sleep_time_for_signal = 0.05
+        self.sleep_time_for_rewind = 0.001
         self.pin_3_YEL = 3  # step
         self.pin_14_BLUE = 14  # (ENA)
         self.pin_4_GREY = 4  # direction (DIR)
@@ -32,6 +33,8 @@ class Servomotor:
             mode of rolling
             0 - full step
             1 - half step
+            2 - quarter step
+            4 - eighth step
 
 
         Returns
@@ -61,15 +64,54 @@ class Servomotor:
             GPIO.output(self.pin_17_MS1, 1)
             GPIO.output(self.pin_18_MS2, 1)
         else:
-            raise 'Error with servomotor mode'
+            raise ValueError(f'Error with servomotor mode: {mode}')
 
-        GPIO.output(self.pin_4_GREY, direction)
+        self.set_direction(direction)
         GPIO.output(self.pin_14_BLUE, 0)
 
-    def next_step(self):
+    def set_direction(self, direction: int):
+        """
+        Changes direction of rolling without reinitializing pins
+
+        Parameters
+        ----------
+        direction : int
+            0 - left
+            1 - right
+        """
+        GPIO.output(self.pin_4_GREY, direction)
+
+    def next_step(self, sleep_time: float = None):
+        """
+        Makes one step of servomotor
+
+        Parameters
+        ----------
+        sleep_time : float
+            half period of step signal in seconds, by default sleep_time_for_signal
+        """
+        if sleep_time is None:
+            sleep_time = self.sleep_time_for_signal
 
         GPIO.output(self.pin_3_YEL, 1)
-        time.sleep(self.sleep_time_for_signal)
+        time.sleep(sleep_time)
         GPIO.output(self.pin_3_YEL, 0)
-        time.sleep(self.sleep_time_for_signal)
+        time.sleep(sleep_time)
+
+    def rewind(self,
+               number_of_steps: int,
+               direction: int):
+        """
+        Moves stage back by number_of_steps at maximum step rate without recording
+
+        Parameters
+        ----------
+        number_of_steps : int
+            count of steps to move
+        direction : int
+            direction of rewind movement
+        """
+        self.set_direction(direction)
+        for _ in range(number_of_steps):
+            self.next_step(sleep_time=self.sleep_time_for_rewind)
 
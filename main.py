@@ -1,34 +1,123 @@
-import os
+import argparse
 
 from PIL import Image
-from queue import Queue
+from queue import Full, Queue
 from tqdm import trange
 from threading import Thread
 
 from hardware_api.camera_api import BaslerCam
 from hardware_api.servomotor_api import Servomotor
 
-from settings import CameraSettings
+from preflight import check_quicklook_bands, run_preflight
+from quicklook import QuicklookBuilder
+from scan_plan import ScanPlan
+from settings import CameraSettings, get_scan_file_path, load_profile, save_profile
 
 
-shots_buffer = Queue()
 sets = CameraSettings()
 
 
-def save_layer(path_to_save: str):
-    global shots_buffer
-    counter = 0
-    while shots_buffer.qsize() > 0:
-        layer = shots_buffer.get()
+def save_layer(shots_buffer: Queue,
+               quicklooks: dict = None,
+               sender=None):
+    """
+    Saves shots from buffer to png files until None is received
+
+    Parameters
+    ----------
+    shots_buffer : Queue
+        queue of (pass_index, path_to_save, line_index, layer) tuples
+    quicklooks : dict
+        QuicklookBuilder for every path_to_save, None - quicklook is disabled
+    sender : FrameSender
+        sender streaming shots to analysis host, None - streaming is disabled
+    """
+    while True:
+        item = shots_buffer.get()
+        if item is None:
+            break
+        pass_index, path_to_save, line_index, layer = item
         img = Image.fromarray(layer)
-        if not os.path.exists(path_to_save):
-            os.mkdir(path_to_save)
-        img.save(f"{path_to_save}/frame_{counter}.png")
-        counter += 1
+        img.save(f"{path_to_save}/frame_{line_index}.png")
+        if quicklooks is not None:
+            quicklooks[path_to_save].add_line(line_index, layer)
+        if sender is not None:
+            sender.send_frame(pass_index, line_index, layer)
+
+
+class ShotsWriter:
+    """
+    Pool of threads saving shots from buffer with save_layer
+
+    Error of any thread is stored and raised from put and close, so capture stops instead of
+    waiting for bounded buffer which nobody drains, and scan is never reported as finished.
+
+    Attributes
+    ----------
+    shots_buffer : Queue
+        queue of (pass_index, path_to_save, line_index, layer) tuples
+    error : Exception
+        first error raised in writer threads
+    """
+    put_timeout = 0.1
+
+    def __init__(self,
+                 writer_threads: int = 1,
+                 buffer_size: int = 0,
+                 quicklooks: dict = None,
+                 sender=None):
+        self.shots_buffer = Queue(maxsize=buffer_size)
+        self.error = None
+        self.threads = [Thread(target=self._run, args=(quicklooks, sender))
+                        for _ in range(writer_threads)]
+
+    def _run(self, quicklooks, sender):
+        try:
+            save_layer(self.shots_buffer, quicklooks, sender)
+        except Exception as e:
+            if self.error is None:
+                self.error = e
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def put(self, item: tuple):
+        """
+        Puts shot to buffer, raises error of writer threads if any of them failed
+        """
+        while True:
+            if self.error is not None:
+                raise self.error
+            try:
+                self.shots_buffer.put(item, timeout=self.put_timeout)
+                return
+            except Full:
+                continue
+
+    def close(self):
+        """
+        Waits until all shots are saved, raises error of writer threads if any of them failed
+        """
+        for _ in self.threads:
+            while any(thread.is_alive() for thread in self.threads):
+                try:
+                    self.shots_buffer.put(None, timeout=self.put_timeout)
+                    break
+                except Full:
+                    continue
+        for thread in self.threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
 
 
 def do_step(camera: BaslerCam,
-            servomotor: Servomotor):
+            servomotor: Servomotor,
+            writer: ShotsWriter,
+            pass_index: int,
+            path_to_save: str,
+            line_index: int):
     """
     Does one step of system concluded shot, adding to hypercube this shot and step of servomotor
 
@@ -38,9 +127,17 @@ def do_step(camera: BaslerCam,
         instance of Basler camera
     servomotor : Servomotor
         instance of servomotor
+    writer : ShotsWriter
+        pool of threads saving shots
+    pass_index : int
+        index of current pass
+    path_to_save : str
+        directory of current pass
+    line_index : int
+        index of line in output cube
     """
     layer = camera.make_shot()
-    shots_buffer.put(layer)
+    writer.put((pass_index, path_to_save, line_index, layer))
     servomotor.next_step()
 
 
@@ -60,68 +157,198 @@ def init_hardware():
     return camera, servomotor
 
 
+def configure_hardware(camera: BaslerCam,
+                       servomotor: Servomotor,
+                       settings: CameraSettings):
+    """
+    Applies validated settings to camera and servomotor
+
+    Parameters
+    ----------
+    camera:
+    servomotor:
+    settings: CameraSettings
+        settings of scan, must be validated before call
+    """
+    if settings.roi is not None:
+        camera.set_roi(*settings.roi)
+
+    camera.set_camera_configures(exposure=settings.exposure,
+                                 gain_value=settings.gain)
+
+    servomotor.sleep_time_for_signal = settings.sleep_time_for_signal
+    servomotor.sleep_time_for_rewind = settings.sleep_time_for_rewind
+    servomotor.initialize_pins(direction=settings.direction,
+                               mode=settings.mode)
+
+
+def admit_scan(camera: BaslerCam,
+               servomotor: Servomotor,
+               settings: CameraSettings,
+               verbose: bool = True) -> CameraSettings:
+    """
+    Checks quicklook bands against frame, runs preflight checks of storage for configured hardware
+    and applies downgraded line rate
+
+    Returns settings which scan must be recorded with
+    """
+    frame_shape = camera.get_frame_shape()
+    check_quicklook_bands(settings, frame_shape)
+
+    if not settings.preflight:
+        return settings
+
+    settings = run_preflight(settings=settings,
+                             frame_shape=frame_shape,
+                             bytes_per_pixel=camera.get_bytes_per_pixel(),
+                             verbose=verbose)
+    servomotor.sleep_time_for_signal = settings.sleep_time_for_signal
+    return settings
+
+
 def start_record(camera: BaslerCam,
                  servomotor: Servomotor,
-                 number_of_steps: int,
-                 path_to_save: str):
+                 plan: ScanPlan,
+                 path_to_save: str,
+                 writer_threads: int = 1,
+                 buffer_size: int = 0,
+                 quicklook: dict = None,
+                 stream: dict = None,
+                 verbose: bool = True):
     """
-    Starts recording of hyperspectral image
+    Starts recording of hyperspectral image according to scan plan
 
     Parameters
     ----------
     camera:
     servomotor:
-    number_of_steps: int
-        count of layers (images) of hyperspectral image which will shouted
+    plan: ScanPlan
+        passes of scan, count of layers (images) in every pass and directions
     path_to_save: str
-        path to mat file in which hyperspepctral image will be saved
+        path to folder in which frames of hyperspectral image will be saved
+    writer_threads: int
+        count of threads saving shots
+    buffer_size: int
+        maximum count of shots waiting for saving, 0 - unlimited
+    quicklook: dict
+        arguments of QuicklookBuilder, quicklook cube and RGB preview are saved to folder of every pass
+    stream: dict
+        arguments of FrameSender, shots are streamed to receiver alongside saving
+    verbose: bool
+        print progress to console
     """
 
-    print('Start recording...')
+    if verbose:
+        print('Start recording...')
 
-    save_thread = Thread(target=save_layer,
-                         args=(path_to_save,))
+    plan.create_pass_dirs(path_to_save)
 
-    for i in trange(number_of_steps):
-        do_step(camera=camera,
-                servomotor=servomotor)
+    quicklooks = None
+    if quicklook is not None:
+        quicklooks = {plan.get_pass_dir(path_to_save, scan_pass): QuicklookBuilder(plan.number_of_steps, **quicklook)
+                      for scan_pass in plan.get_passes() if scan_pass.record}
 
-        if i == 0:
-            save_thread.start()
+    sender = None
+    if stream is not None:
+        # streaming is optional, so headless recording does not import it
+        from streaming import FrameSender
+        sender = FrameSender(**stream)
+        sender.start({'number_of_steps': plan.number_of_steps,
+                      'passes': plan.passes,
+                      'bidirectional': plan.bidirectional})
 
-    save_thread.join()
-    print(f'End saving shots to {path_to_save}')
+    writer = ShotsWriter(writer_threads=writer_threads,
+                         buffer_size=buffer_size,
+                         quicklooks=quicklooks,
+                         sender=sender)
+    writer.start()
+
+    try:
+        for scan_pass in plan.get_passes():
+            if not scan_pass.record:
+                steps = plan.number_of_steps if scan_pass.steps is None else scan_pass.steps
+                servomotor.rewind(number_of_steps=steps,
+                                  direction=scan_pass.direction)
+                continue
+
+            servomotor.set_direction(scan_pass.direction)
+            for _ in range(scan_pass.lead_in_steps):
+                servomotor.next_step()
+            pass_dir = plan.get_pass_dir(path_to_save, scan_pass)
+            steps = trange(plan.number_of_steps) if verbose else range(plan.number_of_steps)
+            for i in steps:
+                do_step(camera=camera,
+                        servomotor=servomotor,
+                        writer=writer,
+                        pass_index=scan_pass.index,
+                        path_to_save=pass_dir,
+                        line_index=scan_pass.line_index(i, plan.number_of_steps))
+    finally:
+        try:
+            writer.close()
+        finally:
+            if sender is not None:
+                sender.close()
+
+    if quicklooks is not None:
+        for pass_dir, builder in quicklooks.items():
+            builder.save(pass_dir)
+
+    if verbose:
+        print(f'End saving shots to {path_to_save}')
 
 
 def save_logs():
 
-    path_to_log = sets.path_to_save.split('.')[0] + '_log.txt'
+    path_to_log = get_scan_file_path(sets.path_to_save, '_log.txt')
     log = f'number_of_steps: {sets.number_of_steps}\n' \
           f'exposure: {sets.exposure}\n' \
           f'gain: {sets.gain}\n' \
           f'mode: {sets.mode}\n' \
           f'direction: {sets.direction}\n' \
+          f'passes: {sets.passes}\n' \
+          f'bidirectional: {sets.bidirectional}\n' \
           f'path_to_save: {sets.path_to_save}\n'
 
     try:
         with open(path_to_log, 'w') as f:
             f.write(log)
-    except Exception:
-        raise "Error with creating log-file"
+    except OSError as e:
+        raise OSError(f"Error with creating log-file {path_to_log}") from e
+
+    save_profile(sets, get_scan_file_path(sets.path_to_save, '_profile.json'))
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Records hyperspectral image with pushbroom scanner')
+    parser.add_argument('-p', '--profile', help='path to JSON or YAML scan profile, defaults from settings.py if omitted')
+    args = parser.parse_args()
+
+    # profile is validated before hardware is touched
+    if args.profile:
+        sets = load_profile(args.profile)
+    else:
+        sets.validate()
+
     camera, servomotor = init_hardware()
 
-    camera.set_camera_configures(exposure=sets.exposure,
-                                 gain_value=sets.gain)
+    configure_hardware(camera=camera,
+                       servomotor=servomotor,
+                       settings=sets)
+
+    sets = admit_scan(camera=camera,
+                      servomotor=servomotor,
+                      settings=sets)
 
-    servomotor.initialize_pins(direction=sets.direction,
-                               mode=sets.mode)
+    plan = ScanPlan.from_settings(sets)
 
     start_record(camera=camera,
                  servomotor=servomotor,
-                 number_of_steps=sets.number_of_steps,
-                 path_to_save=sets.path_to_save)
+                 plan=plan,
+                 path_to_save=sets.path_to_save,
+                 writer_threads=sets.writer_threads,
+                 buffer_size=sets.buffer_size,
+                 quicklook=sets.get_quicklook_options(),
+                 stream=sets.get_stream_options())
 
     save_logs()
@@ -1,71 +1,72 @@
+import argparse
 import cv2
-import os
 import sys
 
-from queue import Queue
-from PIL import Image
-from threading import Thread
-
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import QThread, QObject, pyqtSignal as Signal, pyqtSlot as Slot
 from PyQt5.QtGui import QPixmap
 
 from gui.common_gui import CIU
 from gui.mac_micro_gui import Ui_MainWindow
-from main import init_hardware
-from settings import CameraSettings
-
+from main import admit_scan, configure_hardware, init_hardware, start_record
+from scan_plan import ScanPlan
+from settings import CameraSettings, get_scan_file_path, load_profile, save_profile
 
-shots_buffer = Queue()
-sets = CameraSettings()
-camera, servomotor = init_hardware()
 
-camera.set_camera_configures(exposure=sets.exposure,
-                             gain_value=sets.gain)
+parser = argparse.ArgumentParser(description='GUI for recording hyperspectral image with pushbroom scanner')
+parser.add_argument('-p', '--profile', help='path to JSON or YAML scan profile, defaults from settings.py if omitted')
+args, _ = parser.parse_known_args()
 
-servomotor.initialize_pins(direction=sets.direction,
-                           mode=sets.mode)
+# profile is validated before hardware is touched
+if args.profile:
+    sets = load_profile(args.profile)
+else:
+    sets = CameraSettings()
+    sets.validate()
 
+camera, servomotor = init_hardware()
 
-def save_layer(path_to_save: str):
-    global shots_buffer
-    counter = 0
-    while shots_buffer.qsize() > 0:
-        layer = shots_buffer.get()
-        img = Image.fromarray(layer)
-        if not os.path.exists(path_to_save):
-            os.mkdir(path_to_save)
-        img.save(f"{path_to_save}/frame_{counter}.png")
-        counter += 1
+configure_hardware(camera=camera,
+                   servomotor=servomotor,
+                   settings=sets)
 
 
 class Worker(QObject):
     global camera
     global servomotor
-    global shots_buffer
     meta_data = Signal(dict)
+    warning_signal = Signal(str)
     finished_signal = Signal()
 
     @Slot(dict)
     def do_work(self, meta):
         try:
 
-            camera.set_camera_configures(exposure=meta.exposure,
-                                         gain_value=meta.gain)
-            servomotor.initialize_pins(direction=meta.direction,
-                                       mode=meta.mode)
-            save_thread = Thread(target=save_layer,
-                                 args=(meta.path_to_save,))
-
-            for i in range(meta.number_of_steps):
-                layer = camera.make_shot()
-                shots_buffer.put(layer)
-                servomotor.next_step()
-
-                if i == 0:
-                    save_thread.start()
-
-            save_thread.join()
+            configure_hardware(camera=camera,
+                               servomotor=servomotor,
+                               settings=meta)
+            requested_sleep_time = meta.sleep_time_for_signal
+            meta = admit_scan(camera=camera,
+                              servomotor=servomotor,
+                              settings=meta,
+                              verbose=False)
+            if meta.sleep_time_for_signal != requested_sleep_time:
+                self.warning_signal.emit(f'Disk is too slow for requested line rate, '
+                                         f'sleep_time_for_signal is increased from {requested_sleep_time} '
+                                         f'to {meta.sleep_time_for_signal:.4f} s')
+            plan = ScanPlan.from_settings(meta)
+
+            start_record(camera=camera,
+                         servomotor=servomotor,
+                         plan=plan,
+                         path_to_save=meta.path_to_save,
+                         writer_threads=meta.writer_threads,
+                         buffer_size=meta.buffer_size,
+                         quicklook=meta.get_quicklook_options(),
+                         stream=meta.get_stream_options(),
+                         verbose=False)
+
+            save_profile(meta, get_scan_file_path(meta.path_to_save, '_profile.json'))
 
             self.meta_data.emit({"Status": "Done"})
         except Exception as e:
@@ -88,13 +89,30 @@ class MainWindow(CIU):
         self.ui.preview_btn.clicked.connect(self.make_shot)
         self.ui.image_label.setGeometry(600, 200, 600, 400)
 
+        self.ui.step_edit.setText(str(sets.number_of_steps))
+        self.ui.exposure_edit.setText(str(sets.exposure))
+        self.ui.gain_edit.setText(str(sets.gain))
+        self.ui.direction_edit.setText(str(sets.direction))
+        self.ui.mode_edit.setText(str(sets.mode))
+
+    @staticmethod
+    def parse_int(edit, name):
+        try:
+            return int(edit.text())
+        except ValueError:
+            raise ValueError(f'{name} must be integer, got {edit.text()!r}')
+
     def make_shot(self):
         global camera
 
         # camera, _ = init_hardware()
 
-        sets.exposure = int(self.ui.exposure_edit.text())
-        sets.gain = int(self.ui.gain_edit.text())
+        try:
+            sets.update(exposure=self.parse_int(self.ui.exposure_edit, 'exposure'),
+                        gain=self.parse_int(self.ui.gain_edit, 'gain'))
+        except ValueError as e:
+            self.show_error(str(e))
+            return
 
         camera.set_camera_configures(exposure=sets.exposure,
                                      gain_value=sets.gain)
@@ -115,19 +133,24 @@ class MainWindow(CIU):
             self.show_error(status["Error"])
 
     def start_record(self):
-        self.ui.start_btn.setEnabled(False)
+        try:
+            sets.update(exposure=self.parse_int(self.ui.exposure_edit, 'exposure'),
+                        gain=self.parse_int(self.ui.gain_edit, 'gain'),
+                        direction=self.parse_int(self.ui.direction_edit, 'direction'),
+                        mode=self.parse_int(self.ui.mode_edit, 'mode'),
+                        number_of_steps=self.parse_int(self.ui.step_edit, 'number_of_steps'))
+        except ValueError as e:
+            self.show_error(str(e))
+            return
 
-        sets.exposure = int(self.ui.exposure_edit.text())
-        sets.gain = int(self.ui.gain_edit.text())
-        sets.direction = int(self.ui.direction_edit.text())
-        sets.mode = int(self.ui.mode_edit.text())
-        sets.number_of_steps = int(self.ui.step_edit.text())
+        self.ui.start_btn.setEnabled(False)
 
         # THREAD SETUP
         self.worker = Worker()
         self.worker_thread = QThread()
 
         self.worker.meta_data.connect(self.end_record)
+        self.worker.warning_signal.connect(self.show_info)
         self.meta_requested.connect(self.worker.do_work)
 
         self.worker.finished_signal.connect(self.worker_thread.quit)
@@ -137,7 +160,7 @@ class MainWindow(CIU):
         self.worker.moveToThread(self.worker_thread)
         self.worker_thread.start()
 
-        self.meta_requested.emit(sets)
+        self.meta_requested.emit(sets.copy())
 
 
 if __name__ == "__main__":
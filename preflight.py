@@ -0,0 +1,155 @@
+import os
+import shutil
+import time
+
+from scan_plan import ScanPlan
+from settings import CameraSettings
+
+
+PROBE_FILE_NAME = '.preflight_probe'
+PROBE_CHUNK_SIZE = 1024 * 1024
+
+
+class PreflightError(Exception):
+    pass
+
+
+def get_frame_bytes(frame_shape: tuple, bytes_per_pixel: int) -> int:
+    """
+    Returns size of one frame in bytes
+
+    PNG compression of noisy sensor data is poor, so uncompressed size is used as upper bound.
+    """
+    height, width = frame_shape
+    return height * width * bytes_per_pixel
+
+
+def estimate_scan_bytes(settings: CameraSettings,
+                        frame_shape: tuple,
+                        bytes_per_pixel: int) -> int:
+    """
+    Returns expected count of bytes written by scan
+    """
+    frame_bytes = get_frame_bytes(frame_shape, bytes_per_pixel)
+    scan_bytes = frame_bytes * settings.number_of_steps * settings.passes
+    if settings.quicklook:
+        # quicklook cube is float32 and never bigger than 4 bytes per frame pixel
+        scan_bytes += frame_shape[0] * frame_shape[1] * 4 * settings.number_of_steps * settings.passes
+    return scan_bytes
+
+
+def get_line_period(settings: CameraSettings) -> float:
+    """
+    Returns expected time of one step in seconds: exposure (microseconds) and two halves of step signal
+    """
+    return settings.exposure / 1_000_000 + 2 * settings.sleep_time_for_signal
+
+
+def probe_write_throughput(path_to_dir: str, probe_size_mb: int = 32) -> float:
+    """
+    Writes probe file to target filesystem and returns write throughput in bytes per second
+
+    Parameters
+    ----------
+    path_to_dir : str
+        existing directory on target filesystem
+    probe_size_mb : int
+        size of probe file in megabytes
+    """
+    path_to_probe = os.path.join(path_to_dir, PROBE_FILE_NAME)
+    chunk = os.urandom(PROBE_CHUNK_SIZE)
+    start = time.perf_counter()
+    try:
+        with open(path_to_probe, 'wb') as f:
+            for _ in range(probe_size_mb):
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        elapsed = time.perf_counter() - start
+    finally:
+        if os.path.exists(path_to_probe):
+            os.remove(path_to_probe)
+    return probe_size_mb * PROBE_CHUNK_SIZE / max(elapsed, 1e-9)
+
+
+def check_quicklook_bands(settings: CameraSettings, frame_shape: tuple):
+    """
+    Raises PreflightError if quicklook bands are out of spectral axis of frame
+    or bins are bigger than count of binned bands or pixels
+    """
+    if not settings.quicklook:
+        return
+    number_of_bands = frame_shape[settings.spectral_axis]
+    for name, bands in (('bands', settings.quicklook_bands), ('rgb_bands', settings.quicklook_rgb_bands)):
+        if bands is not None and max(bands) >= number_of_bands:
+            raise PreflightError(f'quicklook {name} {list(bands)} are out of {number_of_bands} bands of frame')
+
+    selected_bands = number_of_bands if settings.quicklook_bands is None else len(settings.quicklook_bands)
+    if settings.quicklook_spectral_bin > selected_bands:
+        raise PreflightError(f'quicklook spectral_bin {settings.quicklook_spectral_bin} is bigger than '
+                             f'{selected_bands} selected bands')
+    width = frame_shape[1 - settings.spectral_axis]
+    if settings.quicklook_spatial_bin > width:
+        raise PreflightError(f'quicklook spatial_bin {settings.quicklook_spatial_bin} is bigger than '
+                             f'{width} pixels of line')
+
+
+def run_preflight(settings: CameraSettings,
+                  frame_shape: tuple,
+                  bytes_per_pixel: int,
+                  verbose: bool = True) -> CameraSettings:
+    """
+    Checks that target filesystem can store planned scan and sustain its line rate
+
+    If disk is slower than scan, settings are downgraded by increasing sleep_time_for_signal
+    (lower line rate) when settings.allow_downgrade is set, otherwise scan is refused.
+
+    Parameters
+    ----------
+    settings : CameraSettings
+        validated settings of scan
+    frame_shape : tuple
+        (height, width) of camera frame with applied ROI
+    bytes_per_pixel : int
+        bytes per pixel of camera pixel format
+    verbose : bool
+        print results of checks to console
+
+    Returns
+    -------
+    settings which scan can be admitted with, copy of settings if they were downgraded
+    """
+    ScanPlan.from_settings(settings).create_pass_dirs(settings.path_to_save)
+
+    scan_bytes = estimate_scan_bytes(settings, frame_shape, bytes_per_pixel)
+    free_bytes = shutil.disk_usage(settings.path_to_save).free
+    if scan_bytes * settings.free_space_margin > free_bytes:
+        raise PreflightError(f'Scan needs {scan_bytes / 2 ** 20:.1f} MB (margin {settings.free_space_margin}), '
+                             f'only {free_bytes / 2 ** 20:.1f} MB free in {settings.path_to_save}')
+
+    frame_bytes = get_frame_bytes(frame_shape, bytes_per_pixel)
+    line_period = get_line_period(settings)
+    required_throughput = frame_bytes / line_period
+    throughput = probe_write_throughput(settings.path_to_save, settings.probe_size_mb)
+
+    if verbose:
+        print(f'Preflight: scan {scan_bytes / 2 ** 20:.1f} MB, free {free_bytes / 2 ** 20:.1f} MB, '
+              f'required {required_throughput / 2 ** 20:.1f} MB/s, disk {throughput / 2 ** 20:.1f} MB/s')
+
+    if throughput >= required_throughput:
+        return settings
+
+    if not settings.allow_downgrade:
+        raise PreflightError(f'Disk write throughput {throughput / 2 ** 20:.1f} MB/s is lower than '
+                             f'required {required_throughput / 2 ** 20:.1f} MB/s')
+
+    min_line_period = frame_bytes / throughput
+    sleep_time_for_signal = (min_line_period - settings.exposure / 1_000_000) / 2
+    downgraded = settings.copy()
+    downgraded.update(sleep_time_for_signal=max(sleep_time_for_signal, settings.sleep_time_for_signal))
+
+    if verbose:
+        print(f'Preflight: line rate downgraded from {1 / line_period:.2f} to {1 / min_line_period:.2f} lines/s, '
+              f'sleep_time_for_signal {downgraded.sleep_time_for_signal:.4f} s')
+
+    return downgraded
@@ -0,0 +1,121 @@
+import numpy as np
+import os
+
+from PIL import Image
+from threading import Lock
+
+
+class QuicklookBuilder:
+    """
+    Builds reduced quicklook cube and RGB preview incrementally, line by line
+
+    Every frame of pushbroom scan is one line of hyperspectral image: one axis of frame is
+    spectral, another is spatial. Selected bands are binned and stored in preallocated arrays,
+    so browse products are ready right after the last line without reading back full frames.
+
+    Attributes
+    ----------
+    number_of_lines : int
+        count of lines (steps) in scan pass
+    bands : list
+        indexes of spectral bands included into quicklook cube, None - all bands
+    spectral_bin : int
+        count of neighbouring selected bands averaged into one band of quicklook cube
+    spatial_bin : int
+        count of neighbouring pixels of line averaged into one pixel
+    rgb_bands : list
+        indexes of spectral bands used as red, green and blue of preview, None - no preview
+    spectral_axis : int
+        axis of frame along which spectrum is dispersed
+    """
+    def __init__(self,
+                 number_of_lines: int,
+                 bands: list = None,
+                 spectral_bin: int = 1,
+                 spatial_bin: int = 1,
+                 rgb_bands: list = None,
+                 spectral_axis: int = 0):
+        self.number_of_lines = number_of_lines
+        self.bands = None if bands is None else np.asarray(bands)
+        self.spectral_bin = spectral_bin
+        self.spatial_bin = spatial_bin
+        self.rgb_bands = None if rgb_bands is None else np.asarray(rgb_bands)
+        self.spectral_axis = spectral_axis
+
+        self.cube = None
+        self.rgb = None
+        self._lock = Lock()
+
+    def _bin_spatial(self, layer: np.array) -> np.array:
+        # layer is (bands, width), width is cropped to multiple of spatial_bin
+        width = layer.shape[1] // self.spatial_bin * self.spatial_bin
+        layer = layer[:, :width]
+        if self.spatial_bin == 1:
+            return layer.astype(np.float32)
+        return layer.reshape(layer.shape[0], -1, self.spatial_bin).mean(axis=2, dtype=np.float32)
+
+    def _bin_spectral(self, layer: np.array) -> np.array:
+        count = layer.shape[0] // self.spectral_bin * self.spectral_bin
+        layer = layer[:count]
+        if self.spectral_bin == 1:
+            return layer
+        return layer.reshape(-1, self.spectral_bin, layer.shape[1]).mean(axis=1)
+
+    def _get_arrays(self, width: int, bands: int) -> tuple:
+        # both arrays are allocated before publishing, so other writer threads never see cube without rgb
+        with self._lock:
+            if self.cube is None:
+                cube = np.zeros((self.number_of_lines, width, bands), dtype=np.float32)
+                rgb = None
+                if self.rgb_bands is not None:
+                    rgb = np.zeros((self.number_of_lines, width, 3), dtype=np.float32)
+                self.cube, self.rgb = cube, rgb
+            return self.cube, self.rgb
+
+    def add_line(self, line_index: int, layer: np.array):
+        """
+        Reduces frame and puts it into quicklook cube and RGB preview
+
+        Parameters
+        ----------
+        line_index : int
+            index of line in scan pass
+        layer : np.array
+            full resolution frame from camera
+        """
+        if layer.ndim == 3:
+            layer = layer[:, :, 0]
+        if self.spectral_axis == 1:
+            layer = layer.T
+
+        selected = layer if self.bands is None else layer[self.bands]
+        line = self._bin_spectral(self._bin_spatial(selected))
+        if line.size == 0:
+            raise ValueError(f'Quicklook bins ({self.spectral_bin}, {self.spatial_bin}) are bigger than '
+                             f'selected part of frame {selected.shape}')
+
+        cube, rgb = self._get_arrays(width=line.shape[1], bands=line.shape[0])
+        cube[line_index] = line.T
+
+        if rgb is not None:
+            rgb[line_index] = self._bin_spatial(layer[self.rgb_bands]).T
+
+    def get_rgb_preview(self) -> np.array:
+        """
+        Returns RGB preview stretched to uint8 by 2 and 98 percentiles of every channel
+        """
+        low = np.percentile(self.rgb, 2, axis=(0, 1))
+        high = np.percentile(self.rgb, 98, axis=(0, 1))
+        scale = np.where(high > low, high - low, 1)
+        rgb = np.clip((self.rgb - low) / scale, 0, 1) * 255
+        return rgb.astype(np.uint8)
+
+    def save(self, path_to_save: str):
+        """
+        Saves quicklook.npy cube and quicklook_rgb.png preview to folder of scan pass
+        """
+        if self.cube is None:
+            return
+        np.save(os.path.join(path_to_save, 'quicklook.npy'), self.cube)
+        if self.rgb is not None:
+            Image.fromarray(self.get_rgb_preview()).save(os.path.join(path_to_save, 'quicklook_rgb.png'))
@@ -0,0 +1,139 @@
+import os
+
+
+class ScanPass:
+    """
+    One movement of stage along the scan line
+
+    Attributes
+    ----------
+    index : int
+        number of recorded pass, None for rewind movements
+    direction : int
+        direction of servomotor for this pass
+    record : bool
+        whether frames are captured during this pass
+    reverse : bool
+        whether line order must be reversed by writer (return pass of bidirectional scan)
+    lead_in_steps : int
+        steps made before first shot of pass
+    steps : int
+        length of rewind movement, None - number_of_steps of plan
+    """
+    def __init__(self,
+                 index,
+                 direction: int,
+                 record: bool,
+                 reverse: bool = False,
+                 lead_in_steps: int = 0,
+                 steps: int = None):
+        self.index = index
+        self.direction = direction
+        self.record = record
+        self.reverse = reverse
+        self.lead_in_steps = lead_in_steps
+        self.steps = steps
+
+    def line_index(self, step: int, number_of_steps: int) -> int:
+        """
+        Returns index of line in output cube for step of this pass
+        """
+        if self.reverse:
+            return number_of_steps - 1 - step
+        return step
+
+
+class ScanPlan:
+    """
+    Plan of movements for single, multi-pass and bidirectional (boustrophedon) scans
+
+    Unidirectional scan records every pass in the same direction and returns the stage
+    to start position with fast rewind between passes. Bidirectional scan records
+    both forward and return passes, so no rewind is needed.
+
+    Every step of pass makes shot and then moves stage, so forward pass records positions
+    0..N-1 and ends at position N. Passes after change of direction make one lead-in step
+    first, so return pass records positions N-1..0 and lines of all passes are registered.
+
+    Attributes
+    ----------
+    number_of_steps : int
+        count of lines in every recorded pass
+    direction : int
+        direction of forward pass
+    passes : int
+        count of recorded passes
+    bidirectional : bool
+        record return passes instead of rewinding
+    rewind_after_scan : bool
+        return stage to start position at maximum step rate after last pass
+    """
+    def __init__(self,
+                 number_of_steps: int,
+                 direction: int = 0,
+                 passes: int = 1,
+                 bidirectional: bool = False,
+                 rewind_after_scan: bool = False):
+        self.number_of_steps = number_of_steps
+        self.direction = direction
+        self.passes = passes
+        self.bidirectional = bidirectional
+        self.rewind_after_scan = rewind_after_scan
+
+    @classmethod
+    def from_settings(cls, settings):
+        """
+        Creates plan from CameraSettings
+        """
+        return cls(number_of_steps=settings.number_of_steps,
+                   direction=settings.direction,
+                   passes=settings.passes,
+                   bidirectional=settings.bidirectional,
+                   rewind_after_scan=settings.rewind_after_scan)
+
+    @property
+    def reverse_direction(self) -> int:
+        return 1 - self.direction
+
+    def get_passes(self) -> list:
+        """
+        Returns sequence of passes with fast rewinds for execution
+        """
+        plan = []
+        for i in range(self.passes):
+            if self.bidirectional and i % 2 == 1:
+                plan.append(ScanPass(i, self.reverse_direction, record=True, reverse=True, lead_in_steps=1))
+            elif self.bidirectional and i > 0:
+                plan.append(ScanPass(i, self.direction, record=True, lead_in_steps=1))
+            else:
+                plan.append(ScanPass(i, self.direction, record=True))
+
+            is_last = i == self.passes - 1
+            if not self.bidirectional and (not is_last or self.rewind_after_scan):
+                plan.append(ScanPass(None, self.reverse_direction, record=False))
+
+        if self.bidirectional and self.rewind_after_scan:
+            if self.passes % 2 == 1:
+                # stage is after last line of forward pass
+                plan.append(ScanPass(None, self.reverse_direction, record=False))
+            else:
+                # stage is one step before first line after return pass
+                plan.append(ScanPass(None, self.direction, record=False, steps=1))
+
+        return plan
+
+    def get_pass_dir(self, path_to_save: str, scan_pass: ScanPass) -> str:
+        """
+        Returns directory for frames of pass, single pass scans are saved directly to path_to_save
+        """
+        if self.passes == 1:
+            return path_to_save
+        return os.path.join(path_to_save, f"pass_{scan_pass.index}")
+
+    def create_pass_dirs(self, path_to_save: str):
+        """
+        Creates folders of all recorded passes before scan
+        """
+        for scan_pass in self.get_passes():
+            if scan_pass.record:
+                os.makedirs(self.get_pass_dir(path_to_save, scan_pass), exist_ok=True)
@@ -1,7 +1,317 @@
+import json
+import os
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+PROFILE_VERSION = 1
+
+SERVOMOTOR_MODES = (0, 1, 2, 4)
+WRITER_BACKENDS = ('png',)
+
+# section of profile file -> {key in section: attribute of CameraSettings}
+PROFILE_SECTIONS = {
+    'camera': {'exposure': 'exposure',
+               'gain': 'gain',
+               'roi': 'roi',
+               'spectral_axis': 'spectral_axis'},
+    'motor': {'mode': 'mode',
+              'direction': 'direction',
+              'sleep_time_for_signal': 'sleep_time_for_signal',
+              'sleep_time_for_rewind': 'sleep_time_for_rewind'},
+    'scan': {'number_of_steps': 'number_of_steps',
+             'passes': 'passes',
+             'bidirectional': 'bidirectional',
+             'rewind_after_scan': 'rewind_after_scan'},
+    'writer': {'backend': 'writer_backend',
+               'path_to_save': 'path_to_save',
+               'threads': 'writer_threads',
+               'buffer_size': 'buffer_size'},
+    'quicklook': {'enabled': 'quicklook',
+                  'bands': 'quicklook_bands',
+                  'spectral_bin': 'quicklook_spectral_bin',
+                  'spatial_bin': 'quicklook_spatial_bin',
+                  'rgb_bands': 'quicklook_rgb_bands'},
+    'preflight': {'enabled': 'preflight',
+                  'allow_downgrade': 'allow_downgrade',
+                  'probe_size_mb': 'probe_size_mb',
+                  'free_space_margin': 'free_space_margin'},
+    'stream': {'enabled': 'stream',
+               'host': 'stream_host',
+               'port': 'stream_port',
+               'batch_size': 'stream_batch_size',
+               'compress': 'stream_compress',
+               'queue_size': 'stream_queue_size',
+               'timeout': 'stream_timeout'},
+}
+
+
+class ProfileError(ValueError):
+    pass
+
+
 class CameraSettings:
+    """
+    Settings of scan: camera, servomotor, scan plan and writer
+
+    Class attributes are defaults, instances may be loaded from versioned profile files
+    (JSON or YAML) and are validated before hardware is touched.
+    """
     number_of_steps = 10
     exposure = 1_000_000
     gain = 0
+    roi = None
+    spectral_axis = 0
     direction = 0
     path_to_save = "./out"
     mode = 0
+    sleep_time_for_signal = 0.05
+    sleep_time_for_rewind = 0.001
+    passes = 1
+    bidirectional = False
+    rewind_after_scan = False
+    writer_backend = 'png'
+    writer_threads = 1
+    buffer_size = 0
+    quicklook = False
+    quicklook_bands = None
+    quicklook_spectral_bin = 1
+    quicklook_spatial_bin = 1
+    quicklook_rgb_bands = None
+    preflight = True
+    allow_downgrade = False
+    probe_size_mb = 32
+    free_space_margin = 1.1
+    stream = False
+    stream_host = '127.0.0.1'
+    stream_port = 5555
+    stream_batch_size = 8
+    stream_compress = False
+    stream_queue_size = 32
+    stream_timeout = 5.0
+
+    def __init__(self, **values):
+        for key, value in values.items():
+            if not hasattr(CameraSettings, key):
+                raise ProfileError(f'Unknown setting: {key}')
+            setattr(self, key, value)
+
+    def get_errors(self) -> list:
+        """
+        Returns list of messages for all invalid settings
+        """
+        errors = []
+
+        def check_int(name, minimum):
+            value = getattr(self, name)
+            if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+                errors.append(f'{name} must be integer >= {minimum}, got {value!r}')
+
+        def check_number(name):
+            value = getattr(self, name)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+                errors.append(f'{name} must be positive number, got {value!r}')
+
+        def check_bool(name):
+            value = getattr(self, name)
+            if not isinstance(value, bool):
+                errors.append(f'{name} must be true or false, got {value!r}')
+
+        def check_choice(name, choices):
+            value = getattr(self, name)
+            if isinstance(value, bool) or not isinstance(value, int) or value not in choices:
+                errors.append(f'{name} must be one of {choices}, got {value!r}')
+
+        check_int('number_of_steps', 1)
+        check_int('exposure', 1)
+        check_int('gain', 0)
+        check_int('passes', 1)
+        check_int('writer_threads', 1)
+        check_int('buffer_size', 0)
+        check_number('sleep_time_for_signal')
+        check_number('sleep_time_for_rewind')
+        check_bool('bidirectional')
+        check_bool('rewind_after_scan')
+        check_bool('quicklook')
+        check_int('quicklook_spectral_bin', 1)
+        check_int('quicklook_spatial_bin', 1)
+        check_bool('preflight')
+        check_bool('allow_downgrade')
+        check_int('probe_size_mb', 1)
+        check_number('free_space_margin')
+        check_bool('stream')
+        check_int('stream_port', 1)
+        if isinstance(self.stream_port, int) and self.stream_port > 65535:
+            errors.append(f'stream_port must be <= 65535, got {self.stream_port!r}')
+        check_int('stream_batch_size', 1)
+        check_bool('stream_compress')
+        check_int('stream_queue_size', 1)
+        check_number('stream_timeout')
+        if not isinstance(self.stream_host, str) or not self.stream_host:
+            errors.append(f'stream host must be non-empty string, got {self.stream_host!r}')
+
+        def is_index_list(value):
+            return isinstance(value, (list, tuple)) and len(value) > 0 and \
+                all(isinstance(v, int) and not isinstance(v, bool) and v >= 0 for v in value)
+
+        if self.quicklook_bands is not None and not is_index_list(self.quicklook_bands):
+            errors.append(f'quicklook bands must be list of band indexes, got {self.quicklook_bands!r}')
+        if self.quicklook_rgb_bands is not None and \
+                not (is_index_list(self.quicklook_rgb_bands) and len(self.quicklook_rgb_bands) == 3):
+            errors.append(f'quicklook rgb_bands must be 3 band indexes, got {self.quicklook_rgb_bands!r}')
+
+        check_choice('direction', (0, 1))
+        check_choice('spectral_axis', (0, 1))
+        check_choice('mode', SERVOMOTOR_MODES)
+        if self.writer_backend not in WRITER_BACKENDS:
+            errors.append(f'writer backend must be one of {WRITER_BACKENDS}, got {self.writer_backend!r}')
+        if not isinstance(self.path_to_save, str) or not self.path_to_save:
+            errors.append(f'path_to_save must be non-empty string, got {self.path_to_save!r}')
+        if self.roi is not None:
+            roi = self.roi
+            if not isinstance(roi, (list, tuple)) or len(roi) != 4 or \
+                    not all(isinstance(v, int) and not isinstance(v, bool) for v in roi) or \
+                    roi[0] < 0 or roi[1] < 0 or roi[2] < 1 or roi[3] < 1:
+                errors.append(f'roi must be [offset_x, offset_y, width, height], got {roi!r}')
+
+        return errors
+
+    def validate(self):
+        """
+        Raises ProfileError with all invalid settings
+        """
+        errors = self.get_errors()
+        if errors:
+            raise ProfileError('Invalid scan profile:\n' + '\n'.join(errors))
+
+    def update(self, **values):
+        """
+        Validates new values and applies them only if whole profile stays valid
+        """
+        settings = self.copy()
+        for key, value in values.items():
+            if not hasattr(CameraSettings, key):
+                raise ProfileError(f'Unknown setting: {key}')
+            setattr(settings, key, value)
+        settings.validate()
+        self.__dict__.update(settings.__dict__)
+
+    def get_quicklook_options(self):
+        """
+        Returns arguments of QuicklookBuilder or None if quicklook is disabled
+        """
+        if not self.quicklook:
+            return None
+        return {'bands': self.quicklook_bands,
+                'spectral_bin': self.quicklook_spectral_bin,
+                'spatial_bin': self.quicklook_spatial_bin,
+                'rgb_bands': self.quicklook_rgb_bands,
+                'spectral_axis': self.spectral_axis}
+
+    def get_stream_options(self):
+        """
+        Returns arguments of FrameSender or None if streaming is disabled
+        """
+        if not self.stream:
+            return None
+        return {'host': self.stream_host,
+                'port': self.stream_port,
+                'batch_size': self.stream_batch_size,
+                'compress': self.stream_compress,
+                'queue_size': self.stream_queue_size,
+                'timeout': self.stream_timeout,
+                'spectral_axis': self.spectral_axis}
+
+    def copy(self):
+        return CameraSettings(**self.__dict__)
+
+    def to_dict(self) -> dict:
+        profile = {'version': PROFILE_VERSION}
+        for section, keys in PROFILE_SECTIONS.items():
+            profile[section] = {key: getattr(self, attr) for key, attr in keys.items()}
+        return profile
+
+    @classmethod
+    def from_dict(cls, profile: dict):
+        """
+        Creates settings from profile dictionary and validates them
+
+        Missing keys are taken from defaults, unknown sections and keys are errors.
+        """
+        if not isinstance(profile, dict):
+            raise ProfileError('Profile must be a mapping')
+
+        version = profile.get('version')
+        if version != PROFILE_VERSION:
+            raise ProfileError(f'Unsupported profile version {version!r}, expected {PROFILE_VERSION}')
+
+        values = {}
+        for section, content in profile.items():
+            if section == 'version':
+                continue
+            if section not in PROFILE_SECTIONS:
+                raise ProfileError(f'Unknown profile section: {section}')
+            if not isinstance(content, dict):
+                raise ProfileError(f'Profile section {section} must be a mapping')
+            for key, value in content.items():
+                if key not in PROFILE_SECTIONS[section]:
+                    raise ProfileError(f'Unknown key {key} in profile section {section}')
+                values[PROFILE_SECTIONS[section][key]] = value
+
+        settings = cls(**values)
+        settings.validate()
+        return settings
+
+
+def load_profile(path_to_profile: str) -> CameraSettings:
+    """
+    Loads and validates scan profile from JSON or YAML file
+
+    Parameters
+    ----------
+    path_to_profile : str
+        path to .json, .yaml or .yml file
+    """
+    extension = os.path.splitext(path_to_profile)[1].lower()
+    with open(path_to_profile, 'r') as f:
+        if extension == '.json':
+            profile = json.load(f)
+        elif extension in ('.yaml', '.yml'):
+            if yaml is None:
+                raise ProfileError('PyYAML is required to load YAML profiles')
+            profile = yaml.safe_load(f)
+        else:
+            raise ProfileError(f'Unsupported profile format: {extension}')
+
+    return CameraSettings.from_dict(profile)
+
+
+def get_scan_file_path(path_to_save: str, suffix: str) -> str:
+    """
+    Returns path of file stored next to output folder of scan, e.g. log or profile
+    """
+    return os.path.normpath(path_to_save) + suffix
+
+
+def save_profile(settings: CameraSettings, path_to_profile: str):
+    """
+    Saves settings to JSON or YAML profile file
+    """
+    profile = settings.to_dict()
+    for section, key in (('camera', 'roi'), ('quicklook', 'bands'), ('quicklook', 'rgb_bands')):
+        if profile[section][key] is not None:
+            profile[section][key] = list(profile[section][key])
+
+    extension = os.path.splitext(path_to_profile)[1].lower()
+    with open(path_to_profile, 'w') as f:
+        if extension == '.json':
+            json.dump(profile, f, indent=4)
+        elif extension in ('.yaml', '.yml'):
+            if yaml is None:
+                raise ProfileError('PyYAML is required to save YAML profiles')
+            yaml.safe_dump(profile, f, sort_keys=False)
+        else:
+            raise ProfileError(f'Unsupported profile format: {extension}')
@@ -0,0 +1,326 @@
+import argparse
+import json
+import numpy as np
+import os
+import socket
+import struct
+import sys
+import zlib
+
+from queue import Full, Queue
+from threading import Thread
+
+
+# length of json header and length of payload of message
+MESSAGE_PREFIX = struct.Struct('!II')
+COMPRESSION_LEVEL = 1
+
+
+def send_message(sock: socket.socket, header: dict, payload: bytes = b''):
+    header = json.dumps(header).encode('utf-8')
+    sock.sendall(MESSAGE_PREFIX.pack(len(header), len(payload)) + header + payload)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(min(size - len(data), 1 << 20))
+        if not chunk:
+            raise ConnectionError('Connection closed in the middle of message')
+        data.extend(chunk)
+    return bytes(data)
+
+
+def recv_message(sock: socket.socket):
+    """
+    Returns (header, payload) of next message or (None, None) if connection is closed
+    """
+    prefix = sock.recv(MESSAGE_PREFIX.size, socket.MSG_WAITALL)
+    if not prefix:
+        return None, None
+    if len(prefix) < MESSAGE_PREFIX.size:
+        prefix += _recv_exactly(sock, MESSAGE_PREFIX.size - len(prefix))
+    header_size, payload_size = MESSAGE_PREFIX.unpack(prefix)
+    header = json.loads(_recv_exactly(sock, header_size).decode('utf-8'))
+    payload = _recv_exactly(sock, payload_size)
+    return header, payload
+
+
+class FrameSender:
+    """
+    Streams frames with their metadata to receiver over TCP
+
+    Frames are sent in batches, one message per batch: json header describing every frame
+    and payload with concatenated frame bytes, optionally compressed with zlib.
+    Streaming is auxiliary to saving on disk: frames are sent from own thread through bounded
+    queue, and failed connection, send timeout or queue overflow stop streaming but not scan.
+
+    Attributes
+    ----------
+    host : str
+        address of receiver
+    port : int
+        port of receiver
+    batch_size : int
+        count of frames in one message
+    compress : bool
+        compress payload of messages with zlib
+    spectral_axis : int
+        axis of frame along which spectrum is dispersed, receiver uses it to assemble cube
+    queue_size : int
+        maximum count of frames waiting for sending
+    timeout : float
+        timeout of connection and sending in seconds
+    failed : bool
+        streaming is stopped because of error
+    """
+    def __init__(self,
+                 host: str,
+                 port: int,
+                 batch_size: int = 8,
+                 compress: bool = False,
+                 spectral_axis: int = 0,
+                 queue_size: int = 32,
+                 timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.batch_size = batch_size
+        self.compress = compress
+        self.spectral_axis = spectral_axis
+        self.timeout = timeout
+
+        self.failed = False
+        self._sock = None
+        self._queue = Queue(maxsize=queue_size)
+        self._thread = Thread(target=self._run, daemon=True)
+
+        try:
+            self._sock = socket.create_connection((host, port), timeout=timeout)
+        except OSError as e:
+            self._fail(e)
+            return
+        self._thread.start()
+
+    def _fail(self, reason):
+        if not self.failed:
+            self.failed = True
+            print(f'Streaming to {self.host}:{self.port} stopped: {reason}')
+
+    def _send(self, header: dict, payload: bytes = b''):
+        if self.failed:
+            return
+        try:
+            send_message(self._sock, header, payload)
+        except OSError as e:
+            self._fail(e)
+
+    def _flush(self, batch: list):
+        if not batch:
+            return
+        frames = []
+        payload = []
+        offset = 0
+        for pass_index, line_index, layer in batch:
+            data = np.ascontiguousarray(layer).tobytes()
+            frames.append({'pass': pass_index,
+                           'line': line_index,
+                           'shape': list(layer.shape),
+                           'dtype': layer.dtype.str,
+                           'offset': offset,
+                           'size': len(data)})
+            payload.append(data)
+            offset += len(data)
+        payload = b''.join(payload)
+        if self.compress:
+            payload = zlib.compress(payload, COMPRESSION_LEVEL)
+        self._send({'type': 'frames', 'compressed': self.compress, 'frames': frames}, payload)
+
+    def _run(self):
+        batch = []
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            kind, content = item
+            if kind == 'start':
+                self._send({'type': 'start', 'metadata': content})
+            else:
+                batch.append(content)
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    batch = []
+        self._flush(batch)
+        self._send({'type': 'end'})
+        self._sock.close()
+
+    def _put(self, item):
+        if self.failed:
+            return
+        try:
+            self._queue.put_nowait(item)
+        except Full:
+            self._fail('queue of frames is full, receiver is too slow')
+
+    def start(self, metadata: dict):
+        """
+        Sends metadata of scan, number_of_steps and passes are required by receiver
+        """
+        self._put(('start', dict(metadata, spectral_axis=self.spectral_axis)))
+
+    def send_frame(self, pass_index: int, line_index: int, layer: np.array):
+        """
+        Queues frame for sending, never blocks
+        """
+        self._put(('frame', (pass_index, line_index, layer)))
+
+    def close(self):
+        """
+        Sends rest of frames and end of stream, waits at most timeout after last send
+        """
+        if not self._thread.is_alive():
+            return
+        # after failure sending thread only drains queue, so put never waits longer than one send
+        self._queue.put(None)
+        self._thread.join()
+
+
+class FrameReceiver:
+    """
+    Receives frames from FrameSender and assembles cube of every scan pass
+
+    Cubes are written line by line with CubeWriter if path_to_cube is set, otherwise they are
+    kept in memory in cubes attribute. Cube layout is (lines, spatial, bands) as in OpenHSL.
+
+    Attributes
+    ----------
+    host : str
+        address to listen
+    port : int
+        port to listen, 0 - any free port
+    path_to_cube : str
+        path to .h5, .hdf5, .mat or .npy file, passes of multi-pass scan are saved to
+        files with _pass_N suffix
+    key : str
+        name of dataset in HDF5 and .mat files
+    complete : bool
+        end of stream was received, so cubes contain all frames sent by scan
+    error : Exception
+        error which stopped receiving, None if stream is complete
+    """
+    def __init__(self,
+                 host: str = '0.0.0.0',
+                 port: int = 0,
+                 path_to_cube: str = None,
+                 key: str = 'image'):
+        self.path_to_cube = path_to_cube
+        self.key = key
+        self.metadata = {}
+        self.cubes = {}
+        self.complete = False
+        self.error = None
+
+        self._server = socket.create_server((host, port))
+        self.host, self.port = self._server.getsockname()[:2]
+
+    def get_pass_path(self, pass_index: int) -> str:
+        if self.metadata.get('passes', 1) == 1:
+            return self.path_to_cube
+        name, extension = os.path.splitext(self.path_to_cube)
+        return f'{name}_pass_{pass_index}{extension}'
+
+    def _get_cube(self, pass_index: int, line: np.array):
+        if pass_index not in self.cubes:
+            shape = (self.metadata['number_of_steps'],) + line.shape
+            if self.path_to_cube is None:
+                self.cubes[pass_index] = np.zeros(shape, dtype=line.dtype)
+            else:
+                # h5py and scipy are needed only on receiver side writing files
+                from convert_frames import CubeWriter
+                self.cubes[pass_index] = CubeWriter(self.get_pass_path(pass_index),
+                                                    shape=shape, dtype=line.dtype, key=self.key)
+        return self.cubes[pass_index]
+
+    def _put_frames(self, header: dict, payload: bytes):
+        if header['compressed']:
+            payload = zlib.decompress(payload)
+        spectral_axis = self.metadata.get('spectral_axis', 0)
+        for frame in header['frames']:
+            data = payload[frame['offset']:frame['offset'] + frame['size']]
+            layer = np.frombuffer(data, dtype=np.dtype(frame['dtype'])).reshape(frame['shape'])
+            line = layer.T if spectral_axis == 0 else layer
+            self._get_cube(frame['pass'], line)[frame['line']] = line
+
+    def serve(self):
+        """
+        Accepts one sender and receives frames until end of stream
+
+        If connection is closed before end of stream (sender timed out, its queue overflowed
+        or network failed), cube files are removed and ConnectionError is raised.
+        """
+        connection, _ = self._server.accept()
+        try:
+            with connection:
+                while True:
+                    header, payload = recv_message(connection)
+                    if header is None:
+                        raise ConnectionError('Sender closed connection before end of stream, cube is incomplete')
+                    if header['type'] == 'end':
+                        break
+                    if header['type'] == 'start':
+                        self.metadata = header['metadata']
+                    elif header['type'] == 'frames':
+                        self._put_frames(header, payload)
+        except BaseException as e:
+            self.error = e
+            if self.path_to_cube is not None:
+                for writer in self.cubes.values():
+                    writer.abort()
+            raise
+        else:
+            if self.path_to_cube is not None:
+                for writer in self.cubes.values():
+                    writer.close()
+            self.complete = True
+        finally:
+            self._server.close()
+
+    def serve_in_thread(self) -> Thread:
+        """
+        Starts serve in background thread, error of receiving is kept in error attribute
+        """
+        def serve():
+            try:
+                self.serve()
+            except Exception:
+                pass
+
+        thread = Thread(target=serve, daemon=True)
+        thread.start()
+        return thread
+
+
+def start_loopback_receiver(path_to_cube: str = None):
+    """
+    Starts receiver on free port of 127.0.0.1 in background thread, e.g. for tests
+
+    Returns receiver and its thread, which finishes when stream ends
+    """
+    receiver = FrameReceiver(host='127.0.0.1', port=0, path_to_cube=path_to_cube)
+    return receiver, receiver.serve_in_thread()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Receives frames streamed by scan and assembles hyperspectral cube')
+    parser.add_argument('path_to_cube', help='output file, one of .h5, .hdf5, .mat, .npy')
+    parser.add_argument('--host', default='0.0.0.0', help='address to listen')
+    parser.add_argument('--port', type=int, default=5555, help='port to listen')
+    parser.add_argument('-k', '--key', default='image', help='name of dataset in HDF5 and .mat files')
+    args = parser.parse_args()
+
+    receiver = FrameReceiver(host=args.host, port=args.port, path_to_cube=args.path_to_cube, key=args.key)
+    print(f'Waiting for scan on {receiver.host}:{receiver.port}...')
+    try:
+        receiver.serve()
+    except ConnectionError as e:
+        sys.exit(f'Cube is not saved: {e}')
+    print(f'Cube saved to {args.path_to_cube}')
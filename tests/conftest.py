@@ -0,0 +1,21 @@
+import os
+import sys
+import types
+
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# camera SDK and GPIO exist only on the controller, tests use fake camera and servomotor
+try:
+    import pypylon
+except ImportError:
+    sys.modules['pypylon'] = mock.MagicMock()
+
+try:
+    import RPi.GPIO
+except (ImportError, RuntimeError):
+    rpi = types.ModuleType('RPi')
+    rpi.GPIO = mock.MagicMock()
+    sys.modules['RPi'] = rpi
+    sys.modules['RPi.GPIO'] = rpi.GPIO
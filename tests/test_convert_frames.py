@@ -0,0 +1,73 @@
+import h5py
+import numpy as np
+import pytest
+import scipy.io as sio
+
+from PIL import Image
+
+from convert_frames import CubeWriter, convert_frames, find_frames, get_missing_frames
+
+
+def save_frames(path, count, shape=(4, 6)):
+    frames = []
+    for i in range(count):
+        frame = np.full(shape, i, dtype=np.uint8)
+        Image.fromarray(frame).save(path / f'frame_{i}.png')
+        frames.append(frame)
+    return frames
+
+
+def test_frames_are_in_natural_order(tmp_path):
+    save_frames(tmp_path, 12)
+    assert list(find_frames(str(tmp_path))) == list(range(12))
+
+
+def test_missing_frames():
+    assert get_missing_frames([0, 1, 4]) == [2, 3]
+    assert get_missing_frames([]) == []
+
+
+@pytest.mark.parametrize('extension', ['.h5', '.npy', '.mat'])
+def test_convert(tmp_path, extension):
+    frames = save_frames(tmp_path, 11)
+    path_to_cube = str(tmp_path / f'cube{extension}')
+    convert_frames(str(tmp_path), path_to_cube, workers=2, batch_size=4)
+
+    if extension == '.h5':
+        with h5py.File(path_to_cube, 'r') as f:
+            cube = f['image'][:]
+    elif extension == '.npy':
+        cube = np.load(path_to_cube)
+    else:
+        cube = sio.loadmat(path_to_cube)['image']
+
+    assert cube.shape == (11, 6, 4)
+    for i, frame in enumerate(frames):
+        np.testing.assert_array_equal(cube[i], frame.T)
+
+
+def test_missing_frames_raise(tmp_path):
+    save_frames(tmp_path, 5)
+    (tmp_path / 'frame_2.png').unlink()
+    with pytest.raises(ValueError):
+        convert_frames(str(tmp_path), str(tmp_path / 'cube.npy'), workers=1)
+    assert convert_frames(str(tmp_path), str(tmp_path / 'cube.npy'), workers=1, allow_missing=True) == [2]
+
+
+@pytest.mark.parametrize('extension', ['.h5', '.npy', '.mat'])
+def test_failed_conversion_leaves_no_output(tmp_path, extension):
+    frames_dir = tmp_path / 'frames'
+    frames_dir.mkdir()
+    save_frames(frames_dir, 6)
+    Image.fromarray(np.zeros((3, 6), dtype=np.uint8)).save(frames_dir / 'frame_4.png')
+
+    with pytest.raises(ValueError):
+        convert_frames(str(frames_dir), str(tmp_path / f'cube{extension}'), workers=2, batch_size=2)
+    assert list(tmp_path.iterdir()) == [frames_dir]
+
+
+def test_too_big_mat_cube_is_refused(tmp_path):
+    path_to_cube = tmp_path / 'cube.mat'
+    with pytest.raises(ValueError):
+        CubeWriter(str(path_to_cube), shape=(1100, 2048, 1024), dtype=np.uint16)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+import time
+
+from PIL import Image
+from threading import Thread
+
+from main import start_record
+from scan_plan import ScanPlan
+
+
+class FakeServomotor:
+    """
+    Tracks position of stage instead of driving GPIO
+    """
+    def __init__(self):
+        self.position = 0
+        self.direction = 0
+
+    def set_direction(self, direction: int):
+        self.direction = direction
+
+    def next_step(self, sleep_time: float = None):
+        self.position += 1 if self.direction == 0 else -1
+
+    def rewind(self, number_of_steps: int, direction: int):
+        self.set_direction(direction)
+        for _ in range(number_of_steps):
+            self.next_step()
+
+
+class FakeCamera:
+    """
+    Returns frame filled with current position of stage
+    """
+    def __init__(self, servomotor: FakeServomotor, shape: tuple = (6, 8), exposure: float = 0):
+        self.servomotor = servomotor
+        self.shape = shape
+        self.exposure = exposure
+
+    def make_shot(self) -> np.array:
+        time.sleep(self.exposure)
+        return np.full(self.shape, self.servomotor.position, dtype=np.uint8)
+
+
+def run_with_timeout(target, timeout=10, **kwargs):
+    result = {}
+
+    def run():
+        try:
+            target(**kwargs)
+        except Exception as e:
+            result['error'] = e
+
+    thread = Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), 'scan hangs'
+    return result.get('error')
+
+
+@pytest.mark.parametrize('passes', [2, 3])
+def test_bidirectional_passes_are_registered(tmp_path, passes):
+    servomotor = FakeServomotor()
+    plan = ScanPlan(number_of_steps=5, passes=passes, bidirectional=True, rewind_after_scan=True)
+    start_record(camera=FakeCamera(servomotor), servomotor=servomotor, plan=plan,
+                 path_to_save=str(tmp_path), writer_threads=2, verbose=False)
+
+    for pass_index in range(passes):
+        for line in range(5):
+            frame = np.asarray(Image.open(tmp_path / f'pass_{pass_index}' / f'frame_{line}.png'))
+            assert (frame == line).all()
+    assert servomotor.position == 0
+
+
+@pytest.mark.parametrize('buffer_size', [0, 2])
+def test_writer_error_stops_scan(tmp_path, buffer_size):
+    servomotor = FakeServomotor()
+    # PIL can't save frames with 5 channels
+    error = run_with_timeout(start_record,
+                             camera=FakeCamera(servomotor, shape=(6, 8, 5), exposure=0.005),
+                             servomotor=servomotor,
+                             plan=ScanPlan(number_of_steps=200),
+                             path_to_save=str(tmp_path),
+                             writer_threads=2,
+                             buffer_size=buffer_size,
+                             verbose=False)
+
+    assert isinstance(error, TypeError)
+    assert servomotor.position < 200
@@ -0,0 +1,105 @@
+import pytest
+
+import preflight
+
+from hardware_api.camera_api import get_pixel_format_bytes
+from main import admit_scan
+from preflight import PreflightError, check_quicklook_bands, estimate_scan_bytes, run_preflight
+from settings import CameraSettings
+
+
+FRAME_SHAPE = (100, 200)
+
+
+class DiskUsage:
+    def __init__(self, free):
+        self.free = free
+
+
+class FakeServomotor:
+    sleep_time_for_signal = 0.05
+
+
+class FakeCamera:
+    def get_frame_shape(self) -> tuple:
+        return FRAME_SHAPE
+
+    def get_bytes_per_pixel(self) -> int:
+        return 2
+
+
+def make_settings(tmp_path, **values):
+    settings = CameraSettings(number_of_steps=10, passes=2, exposure=10_000, sleep_time_for_signal=0.01,
+                              path_to_save=str(tmp_path / 'out'), **values)
+    settings.validate()
+    return settings
+
+
+def test_estimate_scan_bytes(tmp_path):
+    settings = make_settings(tmp_path)
+    assert estimate_scan_bytes(settings, FRAME_SHAPE, 2) == 100 * 200 * 2 * 10 * 2
+
+    settings.quicklook = True
+    assert estimate_scan_bytes(settings, FRAME_SHAPE, 2) == 100 * 200 * (2 + 4) * 10 * 2
+
+
+@pytest.mark.parametrize('pixel_format, bytes_per_pixel', [
+    ('Mono8', 1), ('Mono12p', 2), ('BayerRG12Packed', 2), ('RGB8', 3), ('BGR8', 3), ('RGB10', 6), ('YUV422_8', 2),
+])
+def test_pixel_format_bytes(pixel_format, bytes_per_pixel):
+    assert get_pixel_format_bytes(pixel_format) == bytes_per_pixel
+
+
+def test_not_enough_free_space_is_refused(tmp_path, monkeypatch):
+    settings = make_settings(tmp_path)
+    scan_bytes = estimate_scan_bytes(settings, FRAME_SHAPE, 2)
+    monkeypatch.setattr(preflight.shutil, 'disk_usage', lambda path: DiskUsage(free=scan_bytes))
+    monkeypatch.setattr(preflight, 'probe_write_throughput', lambda path, size: float('inf'))
+
+    with pytest.raises(PreflightError):
+        run_preflight(settings, FRAME_SHAPE, 2, verbose=False)
+
+    settings.free_space_margin = 1.0
+    assert run_preflight(settings, FRAME_SHAPE, 2, verbose=False) is settings
+
+
+def test_slow_disk_is_refused(tmp_path, monkeypatch):
+    settings = make_settings(tmp_path)
+    monkeypatch.setattr(preflight, 'probe_write_throughput', lambda path, size: 1000.0)
+
+    with pytest.raises(PreflightError):
+        run_preflight(settings, FRAME_SHAPE, 2, verbose=False)
+
+
+def test_slow_disk_downgrades_line_rate(tmp_path, monkeypatch):
+    settings = make_settings(tmp_path, allow_downgrade=True)
+    frame_bytes = 100 * 200 * 2
+    # disk writes one frame in 0.1 s: line period 0.01 + 2 * sleep must be 0.1
+    monkeypatch.setattr(preflight, 'probe_write_throughput', lambda path, size: frame_bytes / 0.1)
+
+    downgraded = run_preflight(settings, FRAME_SHAPE, 2, verbose=False)
+    assert downgraded.sleep_time_for_signal == pytest.approx(0.045)
+    assert settings.sleep_time_for_signal == 0.01
+
+
+def test_admit_scan_applies_downgrade_to_servomotor(tmp_path, monkeypatch):
+    settings = make_settings(tmp_path, allow_downgrade=True)
+    monkeypatch.setattr(preflight, 'probe_write_throughput', lambda path, size: 100 * 200 * 2 / 0.1)
+    servomotor = FakeServomotor()
+
+    admitted = admit_scan(FakeCamera(), servomotor, settings, verbose=False)
+    assert servomotor.sleep_time_for_signal == admitted.sleep_time_for_signal == pytest.approx(0.045)
+
+
+@pytest.mark.parametrize('values', [
+    {'quicklook_bands': [0, 100]},
+    {'quicklook_rgb_bands': [0, 1, 100]},
+    {'quicklook_bands': [0, 1], 'quicklook_spectral_bin': 3},
+    {'quicklook_spectral_bin': 101},
+    {'quicklook_spatial_bin': 201},
+    {'spectral_axis': 1, 'quicklook_spatial_bin': 101},
+])
+def test_invalid_quicklook_options_are_refused(tmp_path, values):
+    settings = make_settings(tmp_path, quicklook=True, **values)
+    with pytest.raises(PreflightError):
+        check_quicklook_bands(settings, FRAME_SHAPE)
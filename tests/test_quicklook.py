@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from quicklook import QuicklookBuilder
+
+
+def test_bands_are_selected_and_binned():
+    builder = QuicklookBuilder(number_of_lines=2, bands=[0, 1, 2, 3], spectral_bin=2, spatial_bin=2)
+    layer = np.arange(6 * 4, dtype=np.uint16).reshape(6, 4)
+    builder.add_line(1, layer)
+
+    assert builder.cube.shape == (2, 2, 2)
+    expected = layer[:4].reshape(2, 2, 2, 2).mean(axis=(1, 3)).T
+    np.testing.assert_allclose(builder.cube[1], expected)
+    np.testing.assert_array_equal(builder.cube[0], 0)
+
+
+def test_spectral_axis_one_is_transposed():
+    builder = QuicklookBuilder(number_of_lines=1, spectral_axis=1)
+    layer = np.arange(12, dtype=np.uint8).reshape(3, 4)
+    builder.add_line(0, layer)
+    np.testing.assert_array_equal(builder.cube[0], layer)
+
+
+def test_rgb_preview_is_saved(tmp_path):
+    builder = QuicklookBuilder(number_of_lines=3, rgb_bands=[0, 1, 2])
+    for i in range(3):
+        builder.add_line(i, np.random.randint(0, 4096, (4, 5), dtype=np.uint16))
+
+    preview = builder.get_rgb_preview()
+    assert preview.shape == (3, 5, 3)
+    assert preview.dtype == np.uint8
+
+    builder.save(str(tmp_path))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['quicklook.npy', 'quicklook_rgb.png']
+
+
+@pytest.mark.parametrize('spectral_bin, spatial_bin', [(5, 1), (1, 6)])
+def test_bins_bigger_than_line_raise(spectral_bin, spatial_bin):
+    builder = QuicklookBuilder(number_of_lines=1, bands=[0, 1, 2, 3], spectral_bin=spectral_bin, spatial_bin=spatial_bin)
+    with pytest.raises(ValueError):
+        builder.add_line(0, np.zeros((6, 5), dtype=np.uint8))
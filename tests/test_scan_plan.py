@@ -0,0 +1,60 @@
+from scan_plan import ScanPlan
+
+
+def simulate_positions(plan: ScanPlan) -> tuple:
+    """
+    Returns {(pass, line): position of stage} and final position for shot-then-step scan
+    """
+    sign = {plan.direction: 1, plan.reverse_direction: -1}
+    position = 0
+    lines = {}
+    for scan_pass in plan.get_passes():
+        if not scan_pass.record:
+            steps = plan.number_of_steps if scan_pass.steps is None else scan_pass.steps
+            position += sign[scan_pass.direction] * steps
+            continue
+        position += sign[scan_pass.direction] * scan_pass.lead_in_steps
+        for step in range(plan.number_of_steps):
+            lines[(scan_pass.index, scan_pass.line_index(step, plan.number_of_steps))] = position
+            position += sign[scan_pass.direction]
+    return lines, position
+
+
+def test_single_pass_has_no_rewind():
+    passes = ScanPlan(number_of_steps=5).get_passes()
+    assert len(passes) == 1
+    assert passes[0].record and not passes[0].reverse
+
+
+def test_unidirectional_passes_rewind_between_passes():
+    plan = ScanPlan(number_of_steps=5, direction=1, passes=3)
+    passes = plan.get_passes()
+    assert [p.record for p in passes] == [True, False, True, False, True]
+    assert all(p.direction == 1 for p in passes if p.record)
+    assert all(p.direction == 0 for p in passes if not p.record)
+
+
+def test_bidirectional_passes_alternate_direction():
+    passes = ScanPlan(number_of_steps=5, passes=3, bidirectional=True).get_passes()
+    assert all(p.record for p in passes)
+    assert [p.direction for p in passes] == [0, 1, 0]
+    assert [p.reverse for p in passes] == [False, True, False]
+
+
+def test_lines_of_all_passes_are_registered():
+    for passes in (1, 2, 3, 4):
+        for bidirectional in (False, True):
+            plan = ScanPlan(number_of_steps=4, passes=passes, bidirectional=bidirectional,
+                            rewind_after_scan=True)
+            lines, final_position = simulate_positions(plan)
+            for (_, line), position in lines.items():
+                assert line == position
+            assert len(lines) == 4 * passes
+            assert final_position == 0
+
+
+def test_pass_dirs(tmp_path):
+    plan = ScanPlan(number_of_steps=2, passes=2, rewind_after_scan=True)
+    plan.create_pass_dirs(str(tmp_path))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['pass_0', 'pass_1']
+    assert ScanPlan(number_of_steps=2).get_pass_dir('out', plan.get_passes()[0]) == 'out'
@@ -0,0 +1,60 @@
+import pytest
+
+from settings import CameraSettings, ProfileError, get_scan_file_path, load_profile, save_profile
+
+
+def test_defaults_are_valid():
+    assert CameraSettings().get_errors() == []
+
+
+def test_from_dict_takes_missing_keys_from_defaults():
+    settings = CameraSettings.from_dict({'version': 1, 'scan': {'number_of_steps': 42}})
+    assert settings.number_of_steps == 42
+    assert settings.exposure == CameraSettings.exposure
+
+
+@pytest.mark.parametrize('profile', [
+    {'version': 2},
+    {'version': 1, 'lens': {}},
+    {'version': 1, 'camera': {'iso': 100}},
+    {'version': 1, 'motor': {'mode': 3}},
+    {'version': 1, 'camera': {'roi': [0, 0, 0, 10]}},
+    {'version': 1, 'quicklook': {'rgb_bands': [1, 2]}},
+])
+def test_from_dict_rejects_invalid_profiles(profile):
+    with pytest.raises(ProfileError):
+        CameraSettings.from_dict(profile)
+
+
+def test_get_errors_reports_every_invalid_setting():
+    errors = CameraSettings(passes=0, direction=2, bidirectional='yes').get_errors()
+    assert len(errors) == 3
+
+
+def test_float_choices_are_rejected():
+    errors = CameraSettings(direction=1.0, spectral_axis=0.0, mode=2.0).get_errors()
+    assert len(errors) == 3
+
+
+def test_update_keeps_settings_when_invalid():
+    settings = CameraSettings()
+    with pytest.raises(ProfileError):
+        settings.update(gain=5, mode=5)
+    assert settings.gain == CameraSettings.gain
+    settings.update(gain=5)
+    assert settings.gain == 5
+
+
+def test_profile_roundtrip(tmp_path):
+    settings = CameraSettings(roi=(0, 0, 100, 50), quicklook=True, quicklook_rgb_bands=[1, 2, 3])
+    path_to_profile = str(tmp_path / 'profile.json')
+    save_profile(settings, path_to_profile)
+    loaded = load_profile(path_to_profile)
+    assert loaded.to_dict() == CameraSettings.from_dict(loaded.to_dict()).to_dict()
+    assert loaded.roi == [0, 0, 100, 50]
+    assert loaded.quicklook_rgb_bands == [1, 2, 3]
+
+
+def test_scan_file_path_is_next_to_output_folder():
+    assert get_scan_file_path('../data/out', '_profile.json') == '../data/out_profile.json'
+    assert get_scan_file_path('./out/', '_log.txt') == 'out_log.txt'
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+import socket
+import time
+
+from streaming import FrameSender, send_message, start_loopback_receiver
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_loopback_assembles_cubes_of_all_passes(compress):
+    receiver, thread = start_loopback_receiver()
+    sender = FrameSender('127.0.0.1', receiver.port, batch_size=3, compress=compress)
+    sender.start({'number_of_steps': 4, 'passes': 2})
+
+    frames = {(p, i): np.random.randint(0, 4096, (5, 7), dtype=np.uint16) for p in range(2) for i in range(4)}
+    for (pass_index, line_index), frame in frames.items():
+        sender.send_frame(pass_index, line_index, frame)
+    sender.close()
+    thread.join(timeout=10)
+
+    assert not thread.is_alive()
+    assert not sender.failed
+    for (pass_index, line_index), frame in frames.items():
+        np.testing.assert_array_equal(receiver.cubes[pass_index][line_index], frame.T)
+
+
+def test_loopback_writes_cube_file(tmp_path):
+    path_to_cube = str(tmp_path / 'cube.npy')
+    receiver, thread = start_loopback_receiver(path_to_cube)
+    sender = FrameSender('127.0.0.1', receiver.port, spectral_axis=1)
+    sender.start({'number_of_steps': 2, 'passes': 1})
+    for i in range(2):
+        sender.send_frame(0, i, np.full((3, 4), i, dtype=np.uint8))
+    sender.close()
+    thread.join(timeout=10)
+
+    assert receiver.complete
+    cube = np.load(path_to_cube)
+    assert cube.shape == (2, 3, 4)
+    assert (cube[1] == 1).all()
+
+
+def test_stream_closed_before_end_leaves_no_cube(tmp_path):
+    path_to_cube = tmp_path / 'cube.npy'
+    receiver, thread = start_loopback_receiver(str(path_to_cube))
+    frame = np.ones((3, 4), dtype=np.uint8)
+    with socket.create_connection(('127.0.0.1', receiver.port)) as sock:
+        send_message(sock, {'type': 'start', 'metadata': {'number_of_steps': 2, 'passes': 1}})
+        send_message(sock, {'type': 'frames', 'compressed': False,
+                            'frames': [{'pass': 0, 'line': 0, 'shape': [3, 4], 'dtype': frame.dtype.str,
+                                        'offset': 0, 'size': frame.nbytes}]}, frame.tobytes())
+    thread.join(timeout=10)
+
+    assert not thread.is_alive()
+    assert not receiver.complete
+    assert isinstance(receiver.error, ConnectionError)
+    assert not path_to_cube.exists()
+
+
+def test_missing_receiver_disables_streaming():
+    server = socket.create_server(('127.0.0.1', 0))
+    port = server.getsockname()[1]
+    server.close()
+
+    sender = FrameSender('127.0.0.1', port, timeout=1)
+    assert sender.failed
+    sender.send_frame(0, 0, np.zeros((2, 2), dtype=np.uint8))
+    sender.close()
+
+
+def test_receiver_which_never_reads_does_not_block_scan():
+    server = socket.create_server(('127.0.0.1', 0))
+    try:
+        sender = FrameSender('127.0.0.1', server.getsockname()[1], batch_size=1, queue_size=4, timeout=0.5)
+        frame = np.zeros((1000, 1000), dtype=np.uint16)
+
+        start = time.perf_counter()
+        for i in range(100):
+            sender.send_frame(0, i, frame)
+        sender.close()
+
+        assert sender.failed
+        assert time.perf_counter() - start < 5
+    finally:
+        server.close()